@@ -22,20 +22,30 @@ def cli():
 @cli.command()
 @click.option('--days', default=30, help='Number of days to analyze')
 @click.option('--force', is_flag=True, help='Reanalyze already processed commits')
-def analyze(days, force):
+@click.option('--all', 'backfill', is_flag=True, help='Backfill the whole history (resumable)')
+@click.option('--chunk-size', default=500, help='Commits per checkpointed chunk (with --all)')
+@click.option('--max-load', default=1.0, type=click.FloatRange(0.01, 1.0),
+              help='Fraction of time spent working, e.g. 0.5 to idle half the time (with --all)')
+@click.option('--restart', is_flag=True, help='Ignore a saved checkpoint (with --all)')
+def analyze(days, force, backfill, chunk_size, max_load, restart):
     """Analyze repository commits and extract decisions"""
+    if backfill and force:
+        raise click.BadOptionUsage('force', "--force cannot be combined with --all")
     try:
         dm = DevMemory()
-        dm.analyze_repository(days=days, force=force)
+        if backfill:
+            dm.backfill_history(chunk_size=chunk_size, max_load=max_load, restart=restart)
+        else:
+            dm.analyze_repository(days=days, force=force)
         dm.close()
     except Exception as e:
         console.print(f"❌ Error: {e}", style="bold red")
         sys.exit(1)
 
-@cli.command()
+@cli.command(name='list')
 @click.option('--limit', default=20, help='Number of decisions to show')
 @click.option('--type', 'decision_type', help='Filter by decision type')
-def list(limit, decision_type):
+def list_(limit, decision_type):
     """List captured decisions"""
     try:
         dm = DevMemory()
@@ -69,6 +79,19 @@ def show(decision_id):
         console.print(f"❌ Error: {e}", style="bold red")
         sys.exit(1)
 
+@cli.command()
+@click.argument('decision_id', type=int)
+@click.option('--limit', default=10, help='Number of related decisions to show')
+def related(decision_id, limit):
+    """Show decisions similar to a given one"""
+    try:
+        dm = DevMemory()
+        dm.find_related(decision_id, limit=limit)
+        dm.close()
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="bold red")
+        sys.exit(1)
+
 @cli.command()
 def stats():
     """Show repository statistics"""
@@ -80,12 +103,37 @@ def stats():
         console.print(f"❌ Error: {e}", style="bold red")
         sys.exit(1)
 
+EXPORT_DEFAULTS = {
+    'markdown': 'DECISIONS.md',
+    'duckdb': 'decisions.duckdb',
+    'parquet': 'decisions.parquet',
+    'arrow': 'decisions.arrow',
+}
+
 @cli.command()
-@click.option('--output', default='DECISIONS.md', help='Output file path')
-def export(output):
-    """Export decisions to Markdown file"""
+@click.option('--output', default=None, help='Output file path')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_DEFAULTS.keys()), default='markdown',
+              help='Markdown report, DuckDB file, or Parquet/Arrow for warehouses')
+def export(output, fmt):
+    """Export decisions to Markdown, DuckDB, Parquet or Arrow"""
     try:
         dm = DevMemory()
+        output = output or EXPORT_DEFAULTS[fmt]
+        
+        if fmt == 'duckdb':
+            from storage.backends import export_duckdb
+            count = export_duckdb(dm.store, output)
+            dm.close()
+            console.print(f"✅ Exported {count} decisions to {output}", style="green")
+            return
+        
+        if fmt in ('parquet', 'arrow'):
+            from storage.arrow_io import export_arrow
+            count = export_arrow(dm.store, output, fmt=fmt)
+            dm.close()
+            console.print(f"✅ Exported {count} decisions to {output}", style="green")
+            return
+        
         decisions = dm.session.query(DecisionModel).order_by(
             DecisionModel.created_at.desc()
         ).all()
@@ -126,6 +174,101 @@ def export(output):
         console.print(f"❌ Error: {e}", style="bold red")
         sys.exit(1)
 
+@cli.command(name='install-hook')
+@click.option('--event', 'events', multiple=True, type=click.Choice(['post-commit', 'post-merge']),
+              help='Hook to install (default: post-commit and post-merge)')
+def install_hook(events):
+    """Capture decisions automatically on every commit and merge"""
+    try:
+        from git import Repo
+        from hooks import install_hooks, HOOK_REVS
+        paths = install_hooks(Repo('.'), events=events or tuple(HOOK_REVS))
+        for path in paths:
+            console.print(f"✅ Installed {path}", style="green")
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="bold red")
+        sys.exit(1)
+
+@cli.command()
+@click.argument('rev', default='HEAD')
+def capture(rev):
+    """Capture decisions from one commit or a range (used by git hooks)"""
+    try:
+        dm = DevMemory(quiet=True)
+        saved = dm.capture_commits(rev)
+        dm.close()
+        if saved:
+            console.print(f"✅ Captured {saved} decision(s) from {rev}", style="green")
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="bold red")
+        sys.exit(1)
+
+@cli.command()
+@click.option('--interval', default=2.0, help='Seconds between ref checks')
+def watch(interval):
+    """Watch branch refs and capture new commits as they land"""
+    try:
+        from hooks import watch_refs
+        dm = DevMemory()
+        console.print(f"👀 Watching refs every {interval}s (Ctrl+C to stop)", style="bold blue")
+        
+        def report(ref, sha, saved):
+            if saved:
+                console.print(f"[cyan]{ref}[/cyan] {sha[:8]}: captured {saved} decision(s)")
+        
+        def report_error(ref, sha, error):
+            console.print(f"⚠️  [cyan]{ref}[/cyan] {sha[:8]}: {error} (retrying)", style="yellow")
+        
+        try:
+            watch_refs(dm, interval=interval, on_capture=report, on_error=report_error)
+        except KeyboardInterrupt:
+            pass
+        dm.close()
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="bold red")
+        sys.exit(1)
+
+@cli.command(name='import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_(path):
+    """Bulk load decisions from a Parquet/Arrow export"""
+    try:
+        from storage.arrow_io import import_arrow
+        dm = DevMemory()
+        count = import_arrow(dm.store, path)
+        dm.sync_index()
+        dm.close()
+        console.print(f"✅ Imported {count} new decisions from {path}", style="green")
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="bold red")
+        sys.exit(1)
+
+@cli.command()
+def analytics():
+    """Show decisions per type per month"""
+    try:
+        from rich.table import Table
+        dm = DevMemory()
+        rows = dm.store.count_by_type_month()
+        dm.close()
+        
+        if not rows:
+            console.print("📭 No decisions tracked yet. Run 'analyze' first!", style="yellow")
+            return
+        
+        table = Table(title=f"Decisions per Type per Month ({dm.store.name})")
+        table.add_column("Month", style="cyan")
+        table.add_column("Type", style="magenta")
+        table.add_column("Count", style="green", justify="right")
+        
+        for dtype, month, count in rows:
+            table.add_row(month, dtype.replace('_', ' ').title(), str(count))
+        
+        console.print(table)
+    except Exception as e:
+        console.print(f"❌ Error: {e}", style="bold red")
+        sys.exit(1)
+
 @cli.command()
 def init():
     """Initialize DevMemory in current repository"""
@@ -177,9 +320,14 @@ def timeline(days):
         
         dm = DevMemory()
         cutoff = datetime.now() - timedelta(days=days)
-        decisions = dm.session.query(DecisionModel).filter(
-            DecisionModel.created_at >= cutoff
-        ).order_by(DecisionModel.created_at.asc()).all()
+        
+        # The aggregates know the newest decision, so empty windows skip the row scan
+        latest = [agg.last_at for agg in dm.store.aggregates() if agg.last_at]
+        decisions = []
+        if latest and max(latest) >= cutoff:
+            decisions = dm.session.query(DecisionModel).filter(
+                DecisionModel.created_at >= cutoff
+            ).order_by(DecisionModel.created_at.asc()).all()
         
         if not decisions:
             console.print("No decisions in this time period", style="yellow")
@@ -233,20 +381,23 @@ def summary():
         from collections import Counter
         dm = DevMemory()
         
-        all_decisions = dm.session.query(DecisionModel).all()
+        # Served from the materialized aggregates, O(groups)
+        aggregates = dm.store.aggregates()
         
-        if not all_decisions:
+        if not aggregates:
             console.print("📭 No decisions tracked yet. Run 'analyze' first!", style="yellow")
             dm.close()
             return
         
-        total = len(all_decisions)
-        by_type = Counter(d.decision_type for d in all_decisions)
-        authors = Counter(d.author for d in all_decisions)
+        by_type = Counter()
+        authors = Counter()
+        for agg in aggregates:
+            by_type[agg.decision_type] += agg.count
+            authors[agg.author] += agg.count
+        total = sum(by_type.values())
         
-        dates = [d.created_at for d in all_decisions]
-        oldest = min(dates)
-        newest = max(dates)
+        oldest = min(agg.first_at for agg in aggregates if agg.first_at)
+        newest = max(agg.last_at for agg in aggregates if agg.last_at)
         days_span = (newest - oldest).days
         
         console.print("\n" + "="*60, style="bold cyan")
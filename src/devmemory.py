@@ -1,37 +1,60 @@
 """DevMemory Core - Main integration module"""
 
+import hashlib
 import os
+import time
 from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from git import Repo
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from git import GitCommandError, Repo
+from sqlalchemy import func
 from rich.console import Console
 from rich.table import Table
 from rich.progress import track
 
-from storage.models import Base, Decision as DecisionModel
+from storage.models import Decision as DecisionModel
+from storage.backends import open_store
+from storage.similarity import SimilarityIndex
 from analyzer.decision_detector import DecisionPatternAnalyzer, Decision
 
 console = Console()
 
+BACKFILL_CHECKPOINT = 'backfill'
+
 class DevMemory:
     """Main DevMemory application"""
     
-    def __init__(self, repo_path='.', db_url='sqlite:///devmemory.db'):
+    def __init__(self, repo_path='.', db_url=None, quiet=False):
         self.repo_path = repo_path
         self.repo = Repo(repo_path)
         self.analyzer = DecisionPatternAnalyzer()
         
-        # Setup database
-        self.engine = create_engine(db_url)
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        # Setup database (DATABASE_URL selects the storage backend)
+        db_url = db_url or os.environ.get('DATABASE_URL', 'sqlite:///devmemory.db')
+        self.store = open_store(db_url)
+        self.engine = self.store.engine
+        self.session = self.store.Session()
+        
+        # Related-decision index lives next to the database file, or in a
+        # per-database file for server backends. It is tagged with the
+        # database identity, so a recreated database never reuses it.
+        url = self.engine.url
+        database = url.database if url.get_backend_name() == 'sqlite' else None
+        if database in ('', ':memory:'):
+            self.index_path = ':memory:'
+        elif database:
+            self.index_path = f"{os.path.splitext(database)[0]}.lsh"
+        else:
+            name = url.render_as_string(hide_password=True)
+            digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]
+            self.index_path = f"devmemory-{digest}.lsh"
+        self.index_source = self.store.database_id()
+        self._index = None
         
-        console.print(f"✅ DevMemory initialized at {repo_path}", style="green")
+        if not quiet:
+            console.print(f"✅ DevMemory initialized at {repo_path}", style="green")
     
-    def analyze_repository(self, days=30, force=False):
+    def analyze_repository(self, days=30, force=False, batch_size=100):
         """Analyze repository commits and extract decisions"""
         console.print(f"\n🔍 Analyzing last {days} days of commits...", style="bold blue")
         
@@ -44,30 +67,17 @@ class DevMemory:
         decisions_found = 0
         decisions_saved = 0
         
-        for commit in track(commits, description="Processing commits"):
-            # Skip if already processed (unless force)
-            if not force:
-                existing = self.session.query(DecisionModel).filter_by(
-                    commit_hash=commit.hexsha
-                ).first()
-                if existing:
-                    continue
+        for start in track(range(0, len(commits), batch_size), description="Processing commits"):
+            batch = commits[start:start + batch_size]
             
-            # Analyze - FIX: Use correct parameter names!
-            decision = self.analyzer.analyze_commit(
-                commit_message=commit.message,
-                files_changed=list(commit.stats.files.keys()),
-                commit_hash=commit.hexsha,
-                author=commit.author.name,
-                date=commit.committed_datetime
-            )
+            # Skip already processed commits (unless force): one lookup per batch
+            known = set() if force else self.store.existing_hashes(c.hexsha for c in batch)
+            decisions = [self._classify(c) for c in batch if c.hexsha not in known]
+            decisions = [d for d in decisions if d]
+            decisions_found += len(decisions)
             
-            if decision:
-                decisions_found += 1
-                
-                # Save to database
-                if self._save_decision(decision):
-                    decisions_saved += 1
+            # Save in short batched transactions so readers are never starved
+            decisions_saved += self._save_decisions(decisions)
         
         console.print(f"\n✅ Analysis complete!", style="bold green")
         console.print(f"   Decisions found: {decisions_found}")
@@ -75,26 +85,157 @@ class DevMemory:
         
         return decisions_saved
     
+    def capture_commits(self, rev='HEAD', exclude=None):
+        """Classify just the given commit (or `a..b` range) and store its decisions.
+        
+        With an `exclude` list, every commit reachable from `rev` but from
+        none of the excluded commits is captured (`git rev-list rev --not ...`).
+        This is the git hook hot path: one lookup for known commits, one
+        diff per new commit and a single INSERT for the whole batch.
+        """
+        if exclude is not None:
+            commits = list(self.repo.iter_commits([rev, '--not', *exclude]))
+        elif '..' in rev:
+            commits = list(self.repo.iter_commits(rev))
+        else:
+            commits = [self.repo.commit(rev)]
+        
+        known = self.store.existing_hashes(c.hexsha for c in commits)
+        decisions = [self._classify(c) for c in commits if c.hexsha not in known]
+        return self._save_decisions([d for d in decisions if d])
+    
+    def _classify(self, commit):
+        """Run the pattern analyzer on a git commit"""
+        return self.analyzer.analyze_commit(
+            commit_message=commit.message,
+            files_changed=list(commit.stats.files.keys()),
+            commit_hash=commit.hexsha,
+            author=commit.author.name,
+            date=commit.committed_datetime
+        )
+    
     def _save_decision(self, decision: Decision) -> bool:
         """Save decision to database"""
+        return self._save_decisions([decision]) == 1
+    
+    def _save_decisions(self, decisions) -> int:
+        """Save a batch of decisions in a single transaction, skipping known commits.
+        
+        Write errors propagate, so callers never record the batch as done.
+        """
+        if not decisions:
+            return 0
+        
+        saved = self.store.bulk_insert(self._decision_rows(decisions))
+        self.sync_index()
+        return saved
+    
+    def _decision_rows(self, decisions):
+        """Convert detected decisions into rows for the store"""
+        return [
+            {
+                'commit_hash': decision.commit_hash,
+                'decision_type': decision.type,
+                'title': decision.title,
+                'summary': decision.summary,
+                'reasoning': f"Confidence: {decision.confidence:.0%}\nIndicators: {', '.join(decision.indicators)}",
+                'author': decision.author,
+                'created_at': decision.date,
+                'tags': ','.join(decision.files_changed[:5])  # First 5 files as tags
+            }
+            for decision in decisions
+        ]
+    
+    def backfill_history(self, chunk_size=500, max_load=1.0, restart=False):
+        """Analyze the whole history in fixed-size chunks, resumable after interruption.
+        
+        The walk is pinned to the HEAD seen when the backfill started, and
+        the (head, offset) cursor is saved in the same transaction as each
+        chunk's decisions. Once a backfill has finished, the next one only
+        walks the commits added since (`base..head`). `max_load` is the
+        fraction of wall time spent working: after each chunk the process
+        idles, which throttles both CPU and the git diff IO.
+        """
+        if not 0 < max_load <= 1:
+            raise ValueError("max_load must be in (0, 1]")
+        
+        state = None if restart else self.store.get_checkpoint(BACKFILL_CHECKPOINT)
+        current = self.repo.head.commit.hexsha
+        
+        if state and not state.get('done'):
+            head, base, offset = state['head'], state.get('base'), state['offset']
+            if not all(self._commit_exists(sha) for sha in (head, base) if sha):
+                console.print(f"⚠️  Checkpointed commit {head[:8]} no longer exists "
+                              f"(history rewritten?); restarting the backfill", style="yellow")
+                head, base, offset = current, None, 0
+            else:
+                console.print(f"\n⏯️  Resuming backfill of {head[:8]} at commit {offset}", style="bold blue")
+        else:
+            head, offset = current, 0
+            base = state['head'] if state else None
+            if base and not self._commit_exists(base):
+                console.print(f"⚠️  Last backfilled commit {base[:8]} no longer exists "
+                              f"(history rewritten?); walking the full history again", style="yellow")
+                base = None
+            if base == head:
+                console.print("✅ History already backfilled up to HEAD", style="green")
+                return 0
+            console.print(f"\n🔍 Backfilling {'new commits' if base else 'full history'} "
+                          f"of {head[:8]}...", style="bold blue")
+        
+        rev = f"{base}..{head}" if base else head
+        total = int(self.repo.git.rev_list('--count', rev))
+        console.print(f"{total - offset} of {total} commits left to analyze\n")
+        
+        # One streaming rev-list for the whole run; the offset is only skipped once
+        commits = self.repo.iter_commits(rev, skip=offset)
+        started = time.monotonic()
+        processed = 0
+        saved = 0
+        
         try:
-            db_decision = DecisionModel(
-                commit_hash=decision.commit_hash,
-                decision_type=decision.type,
-                title=decision.title,
-                summary=decision.summary,
-                reasoning=f"Confidence: {decision.confidence:.0%}\nIndicators: {', '.join(decision.indicators)}",
-                author=decision.author,
-                created_at=decision.date,
-                tags=','.join(decision.files_changed[:5])  # First 5 files as tags
-            )
-            
-            self.session.add(db_decision)
-            self.session.commit()
+            while offset < total:
+                chunk_started = time.monotonic()
+                chunk = list(islice(commits, chunk_size))
+                if not chunk:
+                    break
+                
+                known = self.store.existing_hashes(c.hexsha for c in chunk)
+                decisions = [self._classify(c) for c in chunk if c.hexsha not in known]
+                offset += len(chunk)
+                
+                saved += self.store.bulk_insert(
+                    self._decision_rows([d for d in decisions if d]),
+                    checkpoint=(BACKFILL_CHECKPOINT,
+                                {'head': head, 'base': base, 'offset': offset,
+                                 'done': offset >= total})
+                )
+                self.sync_index()
+                processed += len(chunk)
+                
+                busy = time.monotonic() - chunk_started
+                if max_load < 1:
+                    time.sleep(busy * (1 - max_load) / max_load)
+                
+                rate = processed / (time.monotonic() - started)
+                eta = timedelta(seconds=int((total - offset) / rate)) if rate else None
+                console.print(f"  {offset}/{total} commits ({offset / total:.0%}) · "
+                              f"{rate:.1f} commits/s · {saved} saved · ETA {eta}", style="dim")
+        except KeyboardInterrupt:
+            console.print(f"\n⏸️  Interrupted at commit {offset}; run 'analyze --all' again to resume",
+                          style="yellow")
+            return saved
+        
+        console.print(f"\n✅ Backfill complete!", style="bold green")
+        console.print(f"   New decisions saved: {saved}\n")
+        return saved
+    
+    def _commit_exists(self, sha):
+        """Whether a commit is still present in the repository"""
+        try:
+            self.repo.git.cat_file('-e', f'{sha}^{{commit}}')
             return True
-        except Exception as e:
-            console.print(f"❌ Error saving decision: {e}", style="red")
-            self.session.rollback()
+        except GitCommandError:
             return False
     
     def list_decisions(self, limit=20, decision_type=None):
@@ -180,16 +321,96 @@ class DevMemory:
         if decision.tags:
             console.print(f"[cyan]Files:[/cyan] {decision.tags}")
     
+    @property
+    def index(self):
+        """Lazily opened similarity index"""
+        if self._index is None:
+            self._index = SimilarityIndex(self.index_path, source=self.index_source)
+        return self._index
+    
+    def sync_index(self, batch_size=1000):
+        """Index decisions inserted before the index existed (or by other tools)"""
+        last_id = self.index.max_id()
+        indexed = 0
+        
+        # Short-lived session, so long runs never sit idle in a transaction
+        session = self.store.Session()
+        try:
+            # Ids ahead of the table mean an older copy of the database was restored
+            if last_id > (session.query(func.max(DecisionModel.id)).scalar() or 0):
+                self.index.reset()
+                last_id = 0
+            
+            while True:
+                rows = session.query(
+                    DecisionModel.id, DecisionModel.title, DecisionModel.summary, DecisionModel.tags
+                ).filter(DecisionModel.id > last_id).order_by(DecisionModel.id).limit(batch_size).all()
+                
+                if not rows:
+                    break
+                
+                self.index.add_many(
+                    (r.id, r.title, r.summary, (r.tags or '').split(',')) for r in rows
+                )
+                last_id = rows[-1].id
+                indexed += len(rows)
+        finally:
+            session.close()
+        
+        return indexed
+    
+    def find_related(self, decision_id, limit=10):
+        """Show decisions similar to the given one"""
+        decision = self.session.get(DecisionModel, decision_id)
+        
+        if not decision:
+            console.print(f"❌ Decision #{decision_id} not found", style="red")
+            return
+        
+        self.sync_index()
+        matches = self.index.related(decision_id, limit=limit)
+        
+        if not matches:
+            console.print(f"🔍 No decisions related to #{decision_id}", style="yellow")
+            return
+        
+        by_id = {
+            d.id: d for d in self.session.query(DecisionModel).filter(
+                DecisionModel.id.in_([m[0] for m in matches])
+            )
+        }
+        
+        table = Table(title=f"Related to #{decision.id}: {decision.title[:50]}")
+        table.add_column("ID", style="dim", justify="right")
+        table.add_column("Similarity", style="cyan", justify="right")
+        table.add_column("Type", style="magenta", width=20)
+        table.add_column("Date", style="cyan", width=12)
+        table.add_column("Title", style="green")
+        
+        for other_id, score in matches:
+            d = by_id.get(other_id)
+            if d is None:
+                continue
+            table.add_row(
+                str(d.id),
+                f"{score:.0%}",
+                d.decision_type.replace('_', ' ').title(),
+                d.created_at.strftime("%Y-%m-%d"),
+                d.title[:60] + "..." if len(d.title) > 60 else d.title
+            )
+        
+        console.print(table)
+    
     def get_statistics(self):
         """Get repository statistics"""
-        total_decisions = self.session.query(DecisionModel).count()
+        # Served from the materialized aggregates, O(groups)
+        from collections import Counter
+        by_type = Counter()
+        for agg in self.store.aggregates():
+            by_type[agg.decision_type] += agg.count
         
-        # Count by type
-        from sqlalchemy import func
-        type_counts = self.session.query(
-            DecisionModel.decision_type,
-            func.count(DecisionModel.id)
-        ).group_by(DecisionModel.decision_type).all()
+        total_decisions = sum(by_type.values())
+        type_counts = list(by_type.items())
         
         console.print("\n📊 DevMemory Statistics\n", style="bold blue")
         console.print(f"Total Decisions: {total_decisions}\n")
@@ -207,3 +428,6 @@ class DevMemory:
     def close(self):
         """Close database connection"""
         self.session.close()
+        self.store.dispose()
+        if self._index is not None:
+            self._index.close()
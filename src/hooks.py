@@ -0,0 +1,112 @@
+"""Git hook installation and ref watching for real-time decision capture"""
+
+import shlex
+import stat
+import sys
+import time
+from pathlib import Path
+
+HOOK_BEGIN = '# >>> devmemory >>>'
+HOOK_END = '# <<< devmemory <<<'
+
+# Commits each hook has to capture
+HOOK_REVS = {
+    'post-commit': 'HEAD',
+    'post-merge': 'ORIG_HEAD..HEAD',
+}
+
+def hooks_dir(repo) -> Path:
+    """Resolve the hooks directory, honouring core.hooksPath"""
+    path = Path(repo.git.rev_parse('--git-path', 'hooks'))
+    if not path.is_absolute():
+        path = Path(repo.working_tree_dir or repo.git_dir) / path
+    return path
+
+def hook_block(event, python=None, cli_path=None) -> str:
+    """Shell snippet that captures new commits in the background"""
+    python = python or sys.executable
+    cli_path = cli_path or str(Path(__file__).resolve().parent / 'cli.py')
+    # Detached so `git commit` never waits on the database
+    return (
+        f'{HOOK_BEGIN}\n'
+        f'{shlex.quote(python)} {shlex.quote(cli_path)} capture {HOOK_REVS[event]} >/dev/null 2>&1 &\n'
+        f'{HOOK_END}\n'
+    )
+
+def install_hooks(repo, events=tuple(HOOK_REVS), python=None, cli_path=None):
+    """Install (or refresh) the DevMemory block in each hook script.
+
+    Existing hooks are kept: the block is appended to them, and a previous
+    DevMemory block is replaced in place. Returns the paths written.
+    """
+    directory = hooks_dir(repo)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    written = []
+    for event in events:
+        if event not in HOOK_REVS:
+            raise ValueError(f"Unsupported hook '{event}' (choose from: {', '.join(HOOK_REVS)})")
+
+        path = directory / event
+        block = hook_block(event, python, cli_path)
+        script = path.read_text() if path.exists() else '#!/bin/sh\n'
+
+        if HOOK_BEGIN in script and HOOK_END in script:
+            before, rest = script.split(HOOK_BEGIN, 1)
+            after = rest.split(HOOK_END, 1)[1].lstrip('\n')
+            script = before + block + after
+        else:
+            script = script.rstrip('\n') + '\n\n' + block
+
+        path.write_text(script)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        written.append(path)
+
+    return written
+
+def read_heads(repo):
+    """Map every branch ref to the commit it points at (one git call)"""
+    output = repo.git.for_each_ref('--format=%(refname) %(objectname)', 'refs/heads')
+    return dict(line.split(' ', 1) for line in output.splitlines() if line)
+
+def watch_refs(dm, interval=2.0, on_capture=None, max_polls=None, heads=None, on_error=None):
+    """Poll branch refs and capture the commits behind every update.
+
+    Meant for shared servers where hooks are not an option. Each update
+    captures every commit not reachable from a previously seen head, so a
+    new branch brings its whole history along. A ref whose capture fails
+    keeps its old head and is retried on the next poll.
+    """
+    heads = read_heads(dm.repo) if heads is None else dict(heads)
+    polls = 0
+
+    while max_polls is None or polls < max_polls:
+        time.sleep(interval)
+        polls += 1
+
+        current = read_heads(dm.repo)
+        for ref, sha in current.items():
+            old = heads.get(ref)
+            if old == sha:
+                continue
+
+            if old and dm._commit_exists(old):
+                rev, exclude = f'{old}..{sha}', None
+            else:
+                # New branch, or its old tip is gone (force push + gc)
+                rev = sha
+                exclude = [h for h in set(heads.values()) if h != old and dm._commit_exists(h)]
+
+            try:
+                saved = dm.capture_commits(rev, exclude=exclude)
+            except Exception as e:
+                if on_error:
+                    on_error(ref, sha, e)
+                continue
+
+            heads[ref] = sha
+            if on_capture:
+                on_capture(ref, sha, saved)
+
+        for ref in set(heads) - set(current):
+            del heads[ref]
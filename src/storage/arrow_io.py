@@ -0,0 +1,106 @@
+"""Columnar Parquet/Arrow export and bulk import of decisions"""
+
+from typing import Dict, Iterator, List
+
+from storage.backends import DECISION_COLUMNS, DecisionStore
+
+FORMATS = ('parquet', 'arrow')
+
+# Low-cardinality columns stored as dictionaries (one copy of each distinct value)
+DICTIONARY_COLUMNS = ('decision_type', 'author')
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow support needs the 'pyarrow' package (pip install pyarrow)")
+    return pyarrow
+
+def decision_schema():
+    """Arrow schema used for every export"""
+    pa = _require_pyarrow()
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.int64()),
+        ('commit_hash', pa.string()),
+        ('decision_type', dictionary),
+        ('title', pa.string()),
+        ('summary', pa.string()),
+        ('reasoning', pa.string()),
+        ('author', dictionary),
+        ('created_at', pa.timestamp('us')),
+        ('tags', pa.string()),
+    ])
+
+def _record_batch(rows: List[Dict], schema, dictionaries: Dict[str, Dict[str, int]]):
+    """Build one record batch.
+
+    Dictionary columns share a growing dictionary across batches, so every
+    batch only appends new values (an IPC delta) instead of replacing it.
+    """
+    pa = _require_pyarrow()
+    arrays = []
+    for field in schema:
+        values = [row[field.name] for row in rows]
+        if field.name in DICTIONARY_COLUMNS:
+            codes = dictionaries.setdefault(field.name, {})
+            indices = [None if v is None else codes.setdefault(v, len(codes)) for v in values]
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array(indices, type=pa.int32()), pa.array(list(codes), type=pa.string())
+            ))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_arrow(store: DecisionStore, path, fmt='parquet', batch_size=10000) -> int:
+    """Stream the decisions table into a Parquet or Arrow IPC file"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (choose from: {', '.join(FORMATS)})")
+
+    pa = _require_pyarrow()
+    schema = decision_schema()
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(str(path), schema)
+    else:
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        writer = pa.ipc.new_file(str(path), schema, options=options)
+
+    exported = 0
+    dictionaries = {}
+    try:
+        for rows in store.iter_batches(batch_size):
+            writer.write_batch(_record_batch(rows, schema, dictionaries))
+            exported += len(rows)
+    finally:
+        writer.close()
+
+    return exported
+
+def read_batches(path, batch_size=10000) -> Iterator[List[Dict]]:
+    """Yield decision rows from a Parquet or Arrow IPC file, one batch at a time"""
+    pa = _require_pyarrow()
+
+    with open(path, 'rb') as f:
+        is_parquet = f.read(4) == b'PAR1'
+
+    if is_parquet:
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(str(path)).iter_batches(batch_size=batch_size)
+    else:
+        reader = pa.ipc.open_file(str(path))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    for batch in batches:
+        yield batch.select(DECISION_COLUMNS).to_pylist()
+
+def import_arrow(store: DecisionStore, path, batch_size=10000) -> int:
+    """Bulk load an exported file into a store, skipping commits it already has.
+
+    Ids are not carried over; the target store assigns its own.
+    """
+    imported = 0
+    for rows in read_batches(path, batch_size):
+        imported += store.bulk_insert(rows)
+    return imported
@@ -0,0 +1,369 @@
+"""Pluggable storage backends for the decisions table"""
+
+import io
+import json
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import case, delete, func, insert, literal, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from storage.models import Base, Decision, DecisionAggregate, StoreMeta, create_db_engine
+
+# Columns written by the bulk loaders (the primary key is generated by the store)
+DECISION_COLUMNS = ['commit_hash', 'decision_type', 'title', 'summary',
+                    'reasoning', 'author', 'created_at', 'tags']
+
+# store_meta key holding the random identity given to each new database
+DATABASE_ID_KEY = 'database_id'
+
+class DecisionStore(ABC):
+    """Base class for a backend holding the decisions table.
+
+    Subclasses provide their dialect's INSERT construct and the month
+    bucketing expression, and may override the row loader; everything else is plain SQLAlchemy and shared across backends.
+
+    Every write bumps a generation counter and updates the per-type/month/
+    author aggregates in the same transaction. The aggregates record the
+    generation they match, so readers can tell when they are stale (a
+    database created before aggregates existed, say) and rebuild them once.
+    """
+
+    name = None
+
+    def __init__(self, database_url):
+        self.url = database_url
+        self.engine = self._create_engine(database_url)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def _create_engine(self, database_url):
+        return create_db_engine(database_url)
+
+    def create_schema(self):
+        """Create missing tables and give a new database its identity"""
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            self._insert_missing_meta(conn, DATABASE_ID_KEY, value=uuid.uuid4().hex)
+
+    def database_id(self) -> str:
+        """Random identity of this database.
+
+        Unlike the URL it changes when the database is dropped and created
+        again, so caches keyed on row ids can tell the two apart.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(StoreMeta.value).where(StoreMeta.key == DATABASE_ID_KEY)
+            ).scalar()
+
+    def existing_hashes(self, hashes, conn=None) -> Set[str]:
+        """Return which of the given commit hashes are already stored"""
+        if conn is None:
+            with self.engine.connect() as conn:
+                return self.existing_hashes(hashes, conn)
+
+        hashes = list(hashes)
+        found = set()
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            found.update(conn.execute(
+                select(Decision.commit_hash).where(Decision.commit_hash.in_(chunk))
+            ).scalars())
+        return found
+
+    def bulk_insert(self, rows: List[Dict], checkpoint: Tuple[str, Dict] = None) -> int:
+        """Insert decision rows in one transaction, skipping known commits.
+
+        `checkpoint` is an optional (key, state) pair saved in the same
+        transaction, so progress markers never run ahead of the data.
+        Returns the number of rows actually inserted.
+        """
+        if not rows and checkpoint is None:
+            return 0
+
+        with self.engine.begin() as conn:
+            # Bumping the counter first takes the write lock, so the
+            # existence check below cannot race another writer
+            generation = self._bump_generation(conn)
+
+            existing = self.existing_hashes((r['commit_hash'] for r in rows), conn)
+            new_rows = []
+            for row in rows:
+                if row['commit_hash'] in existing:
+                    continue
+                existing.add(row['commit_hash'])
+                new_rows.append({c: row.get(c) for c in DECISION_COLUMNS})
+
+            if new_rows:
+                self._load_rows(conn, new_rows)
+            self._add_to_aggregates(conn, new_rows, generation)
+
+            if checkpoint is not None:
+                self._set_meta_value(conn, checkpoint[0], json.dumps(checkpoint[1]))
+
+        return len(new_rows)
+
+    def _load_rows(self, conn, rows: List[Dict]):
+        """Insert rows known to be new (backend-specific fast path)"""
+        conn.execute(insert(Decision.__table__), rows)
+
+    @abstractmethod
+    def _insert(self, table):
+        """Dialect INSERT construct supporting on_conflict_do_nothing()"""
+
+    def _insert_missing_meta(self, conn, key, **values):
+        conn.execute(self._insert(StoreMeta).values(key=key, **values)
+                     .on_conflict_do_nothing(index_elements=['key']))
+
+    def _meta_counter(self, conn, key):
+        return conn.execute(select(StoreMeta.counter).where(StoreMeta.key == key)).scalar()
+
+    # Insert-if-missing first, then UPDATE: on PostgreSQL an UPDATE that
+    # finds no row takes no lock, so two first-time writers would both
+    # INSERT and one would fail on the primary key
+    def _set_meta_counter(self, conn, key, value):
+        self._insert_missing_meta(conn, key)
+        conn.execute(update(StoreMeta).where(StoreMeta.key == key).values(counter=value))
+
+    def _set_meta_value(self, conn, key, value):
+        self._insert_missing_meta(conn, key)
+        conn.execute(update(StoreMeta).where(StoreMeta.key == key).values(value=value))
+
+    def get_checkpoint(self, key) -> Dict:
+        """Return a state saved through bulk_insert(checkpoint=...), or None"""
+        with self.engine.connect() as conn:
+            value = conn.execute(select(StoreMeta.value).where(StoreMeta.key == key)).scalar()
+        return json.loads(value) if value else None
+
+    def _bump_generation(self, conn) -> int:
+        self._insert_missing_meta(conn, 'generation', counter=0)
+        conn.execute(update(StoreMeta).where(StoreMeta.key == 'generation')
+                     .values(counter=StoreMeta.counter + 1))
+        return self._meta_counter(conn, 'generation')
+
+    def generation(self) -> int:
+        """Write generation of the store (0 before the first write)"""
+        with self.engine.connect() as conn:
+            return self._meta_counter(conn, 'generation') or 0
+
+    def _add_to_aggregates(self, conn, rows: List[Dict], generation):
+        """Fold freshly inserted rows into the aggregates (O(groups touched))"""
+        # Only maintain aggregates that were current before this write
+        if self._meta_counter(conn, 'aggregates_generation') != generation - 1:
+            return
+
+        groups = defaultdict(list)
+        for row in rows:
+            created = row['created_at']
+            month = created.strftime('%Y-%m') if created else ''
+            groups[(row['decision_type'], month, row['author'] or '')].append(created)
+
+        agg = DecisionAggregate
+        for (dtype, month, author), dates in groups.items():
+            count = len(dates)
+            dates = [d for d in dates if d is not None]
+            first, last = (min(dates), max(dates)) if dates else (None, None)
+
+            values = {'count': agg.count + count}
+            if first:
+                values['first_at'] = case((agg.first_at.is_(None) | (agg.first_at > first), first),
+                                          else_=agg.first_at)
+                values['last_at'] = case((agg.last_at.is_(None) | (agg.last_at < last), last),
+                                         else_=agg.last_at)
+
+            updated = conn.execute(update(agg).where(
+                (agg.decision_type == dtype) & (agg.month == month) & (agg.author == author)
+            ).values(**values)).rowcount
+            if not updated:
+                conn.execute(insert(agg).values(
+                    decision_type=dtype, month=month, author=author,
+                    count=count, first_at=first, last_at=last
+                ))
+
+        self._set_meta_counter(conn, 'aggregates_generation', generation)
+
+    def rebuild_aggregates(self):
+        """Recompute the aggregates from the decisions table"""
+        month = func.coalesce(self._month_expr(Decision.created_at), '')
+        with self.engine.begin() as conn:
+            generation = self._bump_generation(conn)
+            conn.execute(delete(DecisionAggregate))
+            conn.execute(insert(DecisionAggregate).from_select(
+                ['decision_type', 'month', 'author', 'count', 'first_at', 'last_at'],
+                select(
+                    Decision.decision_type, month, func.coalesce(Decision.author, literal('')),
+                    func.count(Decision.id), func.min(Decision.created_at), func.max(Decision.created_at)
+                ).group_by(Decision.decision_type, month, func.coalesce(Decision.author, literal('')))
+            ))
+            self._set_meta_counter(conn, 'aggregates_generation', generation)
+
+    def aggregates(self) -> List[DecisionAggregate]:
+        """Return every (type, month, author) aggregate row, rebuilding if stale"""
+        with self.engine.connect() as conn:
+            stale = (self._meta_counter(conn, 'aggregates_generation')
+                     != (self._meta_counter(conn, 'generation') or 0))
+        if stale:
+            self.rebuild_aggregates()
+
+        session = self.Session()
+        try:
+            return session.query(DecisionAggregate).all()
+        finally:
+            session.close()
+
+    def iter_batches(self, batch_size=10000) -> Iterator[List[Dict]]:
+        """Stream every decision as lists of row dicts, oldest id first"""
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                select(Decision.__table__).order_by(Decision.id)
+            )
+            for partition in result.mappings().partitions(batch_size):
+                yield [dict(row) for row in partition]
+
+    @abstractmethod
+    def _month_expr(self, column):
+        """SQL expression bucketing a timestamp column into 'YYYY-MM'"""
+
+    def count_by_type_month(self) -> List[Tuple[str, str, int]]:
+        """Return (decision_type, 'YYYY-MM', count) rows, oldest month first"""
+        counts = defaultdict(int)
+        for agg in self.aggregates():
+            counts[(agg.month, agg.decision_type)] += agg.count
+        return [(dtype, month, count) for (month, dtype), count in sorted(counts.items())]
+
+    def dispose(self):
+        """Release pooled connections"""
+        self.engine.dispose()
+
+class SQLiteStore(DecisionStore):
+    """Default single-file backend"""
+
+    name = 'sqlite'
+
+    def _insert(self, table):
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table)
+
+    def _load_rows(self, conn, rows: List[Dict]):
+        conn.execute(self._insert(Decision.__table__).on_conflict_do_nothing(
+            index_elements=['commit_hash']
+        ), rows)
+
+    def _month_expr(self, column):
+        return func.strftime('%Y-%m', column)
+
+def _copy_csv_field(value) -> str:
+    """Encode one value for COPY ... (FORMAT csv).
+
+    COPY reads an unquoted empty field as NULL and any quoted field as a
+    literal, so every non-NULL value is quoted and no data can collide with
+    the NULL marker.
+    """
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+class PostgresStore(DecisionStore):
+    """PostgreSQL backend that bulk loads through COPY into a staging table"""
+
+    name = 'postgresql'
+
+    def _create_engine(self, database_url):
+        from sqlalchemy import create_engine
+        return create_engine(database_url, pool_size=5, max_overflow=10)
+
+    def _insert(self, table):
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table)
+
+    def _load_rows(self, conn, rows: List[Dict]):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(','.join(_copy_csv_field(row[c]) for c in DECISION_COLUMNS) + '\n')
+        buffer.seek(0)
+
+        columns = ', '.join(DECISION_COLUMNS)
+        # COPY runs on the DBAPI cursor of the transaction's own connection
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(
+                f"CREATE TEMP TABLE decisions_load ON COMMIT DROP AS "
+                f"SELECT {columns} FROM decisions WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY decisions_load ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(
+                f"INSERT INTO decisions ({columns}) SELECT {columns} FROM decisions_load "
+                f"ON CONFLICT (commit_hash) DO NOTHING"
+            )
+        finally:
+            cursor.close()
+
+    def _month_expr(self, column):
+        return func.to_char(column, 'YYYY-MM')
+
+BACKENDS = {
+    SQLiteStore.name: SQLiteStore,
+    PostgresStore.name: PostgresStore,
+}
+
+def open_store(database_url='sqlite:///devmemory.db') -> DecisionStore:
+    """Return the backend matching the URL scheme, with its schema created"""
+    backend = make_url(database_url).get_backend_name()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported database backend '{backend}' "
+                         f"(choose from: {', '.join(sorted(BACKENDS))})")
+
+    store = BACKENDS[backend](database_url)
+    store.create_schema()
+    return store
+
+def export_duckdb(store: DecisionStore, path, batch_size=10000) -> int:
+    """Copy every decision into a DuckDB file for columnar analytics.
+
+    Rows travel as Arrow record batches that DuckDB scans in place, so the
+    load is one vectorized INSERT per batch rather than one per row.
+    """
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("DuckDB export needs the 'duckdb' package (pip install duckdb)")
+    from storage.arrow_io import _record_batch, _require_pyarrow, decision_schema
+
+    pa = _require_pyarrow()
+    schema = decision_schema()
+    columns = ', '.join(['id'] + DECISION_COLUMNS)
+
+    conn = duckdb.connect(str(path))
+    try:
+        conn.execute("DROP TABLE IF EXISTS decisions")
+        conn.execute("""
+            CREATE TABLE decisions (
+                id INTEGER PRIMARY KEY,
+                commit_hash VARCHAR,
+                decision_type VARCHAR,
+                title VARCHAR,
+                summary VARCHAR,
+                reasoning VARCHAR,
+                author VARCHAR,
+                created_at TIMESTAMP,
+                tags VARCHAR
+            )
+        """)
+
+        exported = 0
+        dictionaries = {}
+        for rows in store.iter_batches(batch_size):
+            conn.register('decisions_batch', pa.Table.from_batches(
+                [_record_batch(rows, schema, dictionaries)]
+            ))
+            conn.execute(f"INSERT INTO decisions ({columns}) SELECT {columns} FROM decisions_batch")
+            conn.unregister('decisions_batch')
+            exported += len(rows)
+        return exported
+    finally:
+        conn.close()
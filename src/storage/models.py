@@ -1,6 +1,7 @@
 """Database models for DevMemory"""
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -23,8 +24,62 @@ class Decision(Base):
     def __repr__(self):
         return f"<Decision {self.title}>"
 
+class DecisionAggregate(Base):
+    """Decision counts per type, month and author, maintained by the write path"""
+    __tablename__ = 'decision_aggregates'
+    
+    decision_type = Column(String(50), primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    author = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    first_at = Column(DateTime)
+    last_at = Column(DateTime)
+
+class StoreMeta(Base):
+    """Key/value bookkeeping (write generation, checkpoints)"""
+    __tablename__ = 'store_meta'
+    
+    key = Column(String(50), primary_key=True)
+    counter = Column(Integer)
+    value = Column(Text)
+
+# How long a connection waits on a locked SQLite database before giving up
+SQLITE_BUSY_TIMEOUT_MS = 30000
+
+def create_db_engine(database_url='sqlite:///devmemory.db'):
+    """Create an engine tuned for one writer (analyze/cron) and many readers.
+
+    File-backed SQLite databases are switched to WAL so readers never block
+    on the writer, and every connection waits on busy locks instead of
+    failing immediately with "database is locked".
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return create_engine(database_url)
+
+    engine = create_engine(
+        database_url,
+        connect_args={'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False},
+        pool_size=5,
+        max_overflow=10,
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _configure_sqlite(dbapi_connection, connection_record):
+        configure_sqlite_connection(dbapi_connection)
+
+    return engine
+
+def configure_sqlite_connection(dbapi_connection):
+    """Apply the WAL/busy-timeout settings to a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
 def init_db(database_url='sqlite:///devmemory.db'):
     """Initialize database"""
-    engine = create_engine(database_url)
+    engine = create_db_engine(database_url)
     Base.metadata.create_all(engine)
     return engine
@@ -0,0 +1,244 @@
+"""Local MinHash/LSH similarity index for finding related decisions"""
+
+import hashlib
+import random
+import re
+import sqlite3
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional, Set, Tuple
+
+from storage.models import SQLITE_BUSY_TIMEOUT_MS, configure_sqlite_connection
+
+# Mersenne prime used for the universal hash family h(x) = (a*x + b) mod P
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_TOKEN_RE = re.compile(r'[a-z0-9_]+')
+
+# Words too common in commit messages to say anything about relatedness
+_STOPWORDS = frozenset({
+    'a', 'an', 'and', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'use', 'with',
+})
+
+class SimilarityIndex:
+    """MinHash signatures bucketed with LSH, stored in a sidecar SQLite file.
+
+    Each decision is reduced to a fixed-size MinHash signature over its
+    title, summary and touched files. Signatures are split into bands and
+    every band is hashed into a bucket, so a query only has to look at the
+    decisions sharing at least one bucket instead of scanning the table.
+
+    Pairs above roughly `threshold` Jaccard similarity share a bucket. A
+    query reads at most `max_candidates` ids per bucket and compares only
+    the `max_candidates` ids colliding in the most bands, so templated
+    commits that all land in the same buckets cannot make it linear.
+    """
+
+    def __init__(self, path='devmemory.lsh', num_perm=120, bands=30, seed=1, source=None,
+                 max_candidates=200):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = (1 / bands) ** (1 / self.rows)
+        self.max_candidates = max_candidates
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randint(1, _PRIME - 1), rng.randint(0, _PRIME - 1))
+                       for _ in range(num_perm)]
+
+        # Same concurrency settings as the main database: readers run
+        # `related` while analyze/capture append to the index
+        self.conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        if path != ':memory:':
+            configure_sqlite_connection(self.conn)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                decision_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                decision_id INTEGER NOT NULL,
+                PRIMARY KEY (band, bucket, decision_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+        # Ids only make sense for the database they came from
+        if source is not None and self.source() != source:
+            self.reset(source)
+
+    @staticmethod
+    def tokenize(title: str, summary: str, files: Iterable[str]) -> Set[str]:
+        """Build the shingle set for a decision: words, word bigrams and file paths"""
+        words = [w for w in _TOKEN_RE.findall(f"{title or ''} {summary or ''}".lower())
+                 if w not in _STOPWORDS]
+        tokens = set(words)
+        tokens.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+        for path in files:
+            path = path.strip()
+            if not path:
+                continue
+            tokens.add(f"file:{path}")
+            tokens.add(f"name:{path.rsplit('/', 1)[-1]}")
+
+        return tokens
+
+    def signature(self, tokens: Set[str]) -> array:
+        """Compute the MinHash signature of a token set"""
+        sig = array('I', [_MAX_HASH] * self.num_perm)
+        if not tokens:
+            return sig
+
+        hashes = [int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest(), 'little')
+                  for t in tokens]
+        for i, (a, b) in enumerate(self._perms):
+            sig[i] = min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+
+        return sig
+
+    def _band_keys(self, sig: array) -> List[int]:
+        """Hash every band of a signature into a signed 64-bit bucket key"""
+        keys = []
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(),
+                                       'little', signed=True))
+        return keys
+
+    def add(self, decision_id: int, title: str, summary: str, files: Iterable[str]):
+        """Index one decision (ids that are already indexed are left untouched)"""
+        self.add_many([(decision_id, title, summary, files)])
+
+    def add_many(self, entries: Iterable[Tuple[int, str, str, Iterable[str]]]):
+        """Index a batch of decisions in a single transaction"""
+        entries = list(entries)
+        known = self._known_ids([e[0] for e in entries])
+
+        sig_rows = []
+        bucket_rows = []
+        for decision_id, title, summary, files in entries:
+            if decision_id in known:
+                continue
+            known.add(decision_id)
+
+            sig = self.signature(self.tokenize(title, summary, files))
+            sig_rows.append((decision_id, sig.tobytes()))
+            bucket_rows.extend((band, key, decision_id)
+                               for band, key in enumerate(self._band_keys(sig)))
+
+        if not sig_rows:
+            return
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO signatures (decision_id, signature) VALUES (?, ?)", sig_rows
+            )
+            self.conn.executemany(
+                "INSERT INTO buckets (band, bucket, decision_id) VALUES (?, ?, ?)", bucket_rows
+            )
+
+    def _known_ids(self, ids: List[int]) -> Set[int]:
+        known = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT decision_id FROM signatures "
+                f"WHERE decision_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            known.update(r[0] for r in rows)
+        return known
+
+    def source(self) -> Optional[str]:
+        """Identifier of the database this index was built from"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        return row[0] if row else None
+
+    def reset(self, source=None):
+        """Drop every indexed decision (and optionally re-tag the source)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM signatures")
+            self.conn.execute("DELETE FROM buckets")
+            if source is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (source,)
+                )
+
+    def max_id(self) -> int:
+        """Highest decision id already indexed (0 when empty)"""
+        row = self.conn.execute("SELECT MAX(decision_id) FROM signatures").fetchone()
+        return row[0] or 0
+
+    def _load_signature(self, decision_id: int) -> Optional[array]:
+        row = self.conn.execute(
+            "SELECT signature FROM signatures WHERE decision_id = ?", (decision_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        sig = array('I')
+        sig.frombytes(row[0])
+        return sig
+
+    def candidates(self, decision_id: int) -> List[int]:
+        """Ids sharing a bucket with the decision, most band collisions first"""
+        sig = self._load_signature(decision_id)
+        if sig is None:
+            return []
+
+        # Newest ids first within each bucket, so an overfull bucket is cut short
+        collisions = Counter()
+        for band, key in enumerate(self._band_keys(sig)):
+            rows = self.conn.execute(
+                "SELECT decision_id FROM buckets WHERE band = ? AND bucket = ? "
+                "ORDER BY decision_id DESC LIMIT ?", (band, key, self.max_candidates + 1)
+            )
+            collisions.update(r[0] for r in rows)
+        collisions.pop(decision_id, None)
+
+        ranked = sorted(collisions.items(), key=lambda x: (-x[1], -x[0]))
+        return [other_id for other_id, _ in ranked[:self.max_candidates]]
+
+    def related(self, decision_id: int, limit=10, min_similarity=None) -> List[Tuple[int, float]]:
+        """Return (decision_id, estimated Jaccard similarity) pairs, best first.
+
+        `min_similarity` defaults to the LSH threshold of the index.
+        """
+        sig = self._load_signature(decision_id)
+        if sig is None:
+            return []
+        if min_similarity is None:
+            min_similarity = self.threshold
+
+        results = []
+        candidates = self.candidates(decision_id)
+        for start in range(0, len(candidates), 500):
+            chunk = candidates[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT decision_id, signature FROM signatures "
+                f"WHERE decision_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for other_id, blob in rows:
+                other = array('I')
+                other.frombytes(blob)
+                score = sum(1 for x, y in zip(sig, other) if x == y) / self.num_perm
+                if score >= min_similarity:
+                    results.append((other_id, score))
+
+        results.sort(key=lambda x: (-x[1], x[0]))
+        return results[:limit]
+
+    def close(self):
+        """Close the index file"""
+        self.conn.close()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Core modules import each other as top-level packages (see src/cli.py)
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
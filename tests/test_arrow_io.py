@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from storage.arrow_io import export_arrow, import_arrow, read_batches
+from storage.backends import open_store
+
+TYPES = ['security_fix', 'workaround', 'api_design']
+
+def make_rows(count):
+    return [
+        {
+            'commit_hash': f'{n:040x}',
+            'decision_type': TYPES[n % len(TYPES)],
+            'title': f'Decision {n}',
+            'summary': f'Decision {n}\n\nDetails',
+            'reasoning': None if n % 2 else 'Confidence: 90%',
+            'author': f'Dev {n % 2}',
+            'created_at': datetime(2025, 1 + n % 12, 1, 9, 30),
+            'tags': 'src/app.py',
+        }
+        for n in range(count)
+    ]
+
+@pytest.fixture
+def source(tmp_path):
+    store = open_store(f"sqlite:///{tmp_path / 'source.db'}")
+    store.bulk_insert(make_rows(7))
+    yield store
+    store.dispose()
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_export_import_round_trip(source, tmp_path, fmt):
+    path = tmp_path / f'decisions.{fmt}'
+    # Small batches so each batch carries its own dictionary
+    assert export_arrow(source, path, fmt=fmt, batch_size=2) == 7
+
+    target = open_store(f"sqlite:///{tmp_path / 'target.db'}")
+    target.bulk_insert(make_rows(2))
+    assert import_arrow(target, path) == 5
+
+    rows = [r for batch in target.iter_batches() for r in batch]
+    expected = {r['commit_hash']: r for r in make_rows(7)}
+    assert len(rows) == 7
+    for row in rows:
+        assert {k: row[k] for k in expected[row['commit_hash']]} == expected[row['commit_hash']]
+    target.dispose()
+
+def test_low_cardinality_columns_are_dictionary_encoded(source, tmp_path):
+    import pyarrow.parquet as pq
+
+    path = tmp_path / 'decisions.parquet'
+    export_arrow(source, path)
+    schema = pq.read_schema(str(path))
+    assert pa.types.is_dictionary(schema.field('decision_type').type)
+    assert pa.types.is_dictionary(schema.field('author').type)
+    assert 'id' not in next(read_batches(path))[0]
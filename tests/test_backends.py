@@ -0,0 +1,230 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from storage.backends import PostgresStore, SQLiteStore, export_duckdb, open_store
+from storage.models import Base, DecisionAggregate, StoreMeta
+
+# Point this at a throwaway database to run the suite against PostgreSQL
+POSTGRES_URL = os.environ.get('DEVMEMORY_TEST_POSTGRES_URL')
+
+BULK_ROWS = 5000
+BULK_BUDGET_SECONDS = 5.0
+
+def make_row(n, decision_type='architecture_change', month=1):
+    return {
+        'commit_hash': f'{n:040x}',
+        'decision_type': decision_type,
+        'title': f'Refactor module {n}',
+        'summary': f'Refactor module {n}\n\nSplit into smaller pieces',
+        'reasoning': 'Confidence: 80%\nIndicators: keywords: refactor',
+        'author': 'Test',
+        'created_at': datetime(2025, month, 15, 12, 0),
+        'tags': 'src/module.py',
+    }
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        url = f"sqlite:///{tmp_path / 'devmemory.db'}"
+    elif POSTGRES_URL:
+        url = POSTGRES_URL
+    else:
+        pytest.skip('DEVMEMORY_TEST_POSTGRES_URL not set')
+
+    store = open_store(url)
+    yield store
+    Base.metadata.drop_all(store.engine)
+    store.dispose()
+
+def test_open_store_picks_backend(tmp_path):
+    store = open_store(f"sqlite:///{tmp_path / 'devmemory.db'}")
+    assert isinstance(store, SQLiteStore)
+    store.dispose()
+
+    with pytest.raises(ValueError):
+        open_store('mysql://localhost/devmemory')
+
+def test_bulk_insert_skips_known_commits(store):
+    assert store.bulk_insert([make_row(1), make_row(2)]) == 2
+    assert store.bulk_insert([make_row(2), make_row(3), make_row(3)]) == 1
+    assert store.bulk_insert([]) == 0
+    assert store.existing_hashes([make_row(n)['commit_hash'] for n in (1, 3, 4)]) == {
+        make_row(1)['commit_hash'], make_row(3)['commit_hash']
+    }
+
+def test_iter_batches_round_trips_rows(store):
+    rows = [make_row(n) for n in range(25)]
+    rows[0]['tags'] = None
+    rows[2]['title'] = r'\N'
+    rows[3]['reasoning'] = ''
+    store.bulk_insert(rows)
+
+    batches = list(store.iter_batches(batch_size=10))
+    assert [len(b) for b in batches] == [10, 10, 5]
+
+    stored = [r for b in batches for r in b]
+    assert [r['commit_hash'] for r in stored] == [r['commit_hash'] for r in rows]
+    assert stored[0]['tags'] is None
+    assert stored[1]['summary'] == rows[1]['summary']
+    assert stored[1]['created_at'] == rows[1]['created_at']
+    assert stored[2]['title'] == r'\N'
+    assert stored[3]['reasoning'] == ''
+
+def test_concurrent_first_writes(store):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Every writer finds the generation row missing when it starts
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        inserted = list(pool.map(lambda n: store.bulk_insert([make_row(n)]), range(4)))
+
+    assert inserted == [1, 1, 1, 1]
+    assert store.generation() == 4
+
+def test_count_by_type_month(store):
+    store.bulk_insert([
+        make_row(1, 'security_fix', month=1),
+        make_row(2, 'security_fix', month=1),
+        make_row(3, 'workaround', month=1),
+        make_row(4, 'security_fix', month=2),
+    ])
+    assert store.count_by_type_month() == [
+        ('security_fix', '2025-01', 2),
+        ('workaround', '2025-01', 1),
+        ('security_fix', '2025-02', 1),
+    ]
+
+def test_bulk_insert_performance(store):
+    rows = [make_row(n) for n in range(BULK_ROWS)]
+    start = time.perf_counter()
+    assert store.bulk_insert(rows) == BULK_ROWS
+    assert time.perf_counter() - start < BULK_BUDGET_SECONDS
+
+def test_duckdb_export_matches_store(store, tmp_path):
+    duckdb = pytest.importorskip('duckdb')
+    store.bulk_insert([make_row(1, 'security_fix', 1), make_row(2, 'workaround', 2)])
+
+    path = tmp_path / 'decisions.duckdb'
+    assert export_duckdb(store, path) == 2
+
+    conn = duckdb.connect(str(path))
+    rows = conn.execute(
+        "SELECT decision_type, strftime(created_at, '%Y-%m') AS month, COUNT(*) "
+        "FROM decisions GROUP BY ALL ORDER BY month, decision_type"
+    ).fetchall()
+    conn.close()
+    assert rows == store.count_by_type_month()
+
+def test_duckdb_export_performance(store, tmp_path):
+    duckdb = pytest.importorskip('duckdb')
+    store.bulk_insert([make_row(n) for n in range(BULK_ROWS)])
+
+    path = tmp_path / 'decisions.duckdb'
+    start = time.perf_counter()
+    assert export_duckdb(store, path, batch_size=1000) == BULK_ROWS
+    assert time.perf_counter() - start < BULK_BUDGET_SECONDS
+
+    conn = duckdb.connect(str(path))
+    assert conn.execute("SELECT COUNT(DISTINCT id), MAX(title) FROM decisions").fetchone() == (
+        BULK_ROWS, 'Refactor module 999'
+    )
+    conn.close()
+
+def aggregate_snapshot(store):
+    return sorted((a.decision_type, a.month, a.author, a.count, a.first_at, a.last_at)
+                  for a in store.aggregates())
+
+def test_aggregates_follow_writes_incrementally(store):
+    store.aggregates()  # materialize while empty
+    generation = store.generation()
+
+    first = make_row(1, 'security_fix', month=3)
+    second = make_row(2, 'security_fix', month=3)
+    second['created_at'] = datetime(2025, 3, 1, 8, 0)
+    store.bulk_insert([first, make_row(3, 'workaround', month=4)])
+    store.bulk_insert([second, first])
+
+    assert store.generation() == generation + 2
+    incremental = aggregate_snapshot(store)
+    assert incremental == [
+        ('security_fix', '2025-03', 'Test', 2, datetime(2025, 3, 1, 8, 0), datetime(2025, 3, 15, 12, 0)),
+        ('workaround', '2025-04', 'Test', 1, datetime(2025, 4, 15, 12, 0), datetime(2025, 4, 15, 12, 0)),
+    ]
+
+    store.rebuild_aggregates()
+    assert aggregate_snapshot(store) == incremental
+
+def test_stale_aggregates_are_rebuilt(store):
+    store.bulk_insert([make_row(1, 'workaround')])
+    store.aggregates()
+
+    # Simulate a database written before aggregates existed
+    with store.engine.begin() as conn:
+        conn.execute(StoreMeta.__table__.delete())
+        conn.execute(DecisionAggregate.__table__.delete())
+
+    assert store.count_by_type_month() == [('workaround', '2025-01', 1)]
+
+class FakeCursor:
+    """Records what the COPY loader sends to a psycopg2 cursor"""
+
+    def __init__(self):
+        self.statements = []
+        self.payload = None
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(sql)
+        self.payload = buffer.read()
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self.connection = self
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+def test_postgres_copy_payload_without_server():
+    pytest.importorskip('psycopg2')
+    store = PostgresStore('postgresql://postgres@stand-in/devmemory')  # never connects
+    row = make_row(1)
+    row.update(title=r'\N', reasoning='', tags=None, summary='Quote "this"\nand more')
+
+    cursor = FakeCursor()
+    store._load_rows(FakeConnection(cursor), [row])
+
+    create, copy, merge = cursor.statements
+    assert create.startswith('CREATE TEMP TABLE decisions_load ON COMMIT DROP')
+    assert copy.startswith('COPY decisions_load (commit_hash, decision_type, title,')
+    assert 'ON CONFLICT (commit_hash) DO NOTHING' in merge
+
+    # NULL is the only unquoted empty field; a literal \N stays a quoted string
+    assert cursor.payload == (
+        f'"{row["commit_hash"]}","architecture_change","\\N","Quote ""this""\nand more",'
+        f'"","Test","2025-01-15 12:00:00",\n'
+    )
+
+def test_postgres_month_expression():
+    pytest.importorskip('psycopg2')
+    from sqlalchemy.dialects import postgresql
+    from storage.models import Decision
+
+    store = PostgresStore('postgresql://postgres@stand-in/devmemory')
+    sql = str(store._month_expr(Decision.created_at).compile(
+        dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}
+    ))
+    assert sql == "to_char(decisions.created_at, 'YYYY-MM')"
+
+def test_store_base_class_is_abstract():
+    from storage.backends import DecisionStore
+
+    with pytest.raises(TypeError):
+        DecisionStore('sqlite://')
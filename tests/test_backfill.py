@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from git import Repo
+
+import cli
+from devmemory import BACKFILL_CHECKPOINT, DevMemory
+from storage.models import Decision as DecisionModel
+
+COMMITS = 12
+
+def commit(repo, n, message):
+    path = f'module_{n}.py'
+    (Path(repo.working_tree_dir) / path).write_text(str(n))
+    repo.index.add([path])
+    return repo.index.commit(message)
+
+def make_history(repo, start, count):
+    """Every third commit is a decision, the rest are plain changes"""
+    for n in range(start, start + count):
+        commit(repo, n, f'Refactor module {n}' if n % 3 == 0 else f'Tweak wording {n}')
+
+@pytest.fixture
+def dm(tmp_path):
+    repo = Repo.init(tmp_path / 'repo')
+    make_history(repo, 0, COMMITS)
+
+    dm = DevMemory(repo_path=repo.working_tree_dir,
+                   db_url=f"sqlite:///{tmp_path / 'devmemory.db'}", quiet=True)
+    yield dm
+    dm.close()
+
+def count_classify(dm, monkeypatch):
+    calls = []
+    monkeypatch.setattr(dm, '_classify',
+                        lambda commit: calls.append(commit.hexsha) or DevMemory._classify(dm, commit))
+    return calls
+
+def test_backfill_resumes_from_checkpoint(dm, monkeypatch):
+    classify = dm._classify
+    calls = []
+
+    def crash_in_second_chunk(commit):
+        calls.append(commit.hexsha)
+        if len(calls) > 5:
+            raise RuntimeError('simulated crash')
+        return classify(commit)
+
+    monkeypatch.setattr(dm, '_classify', crash_in_second_chunk)
+    with pytest.raises(RuntimeError):
+        dm.backfill_history(chunk_size=5)
+
+    state = dm.store.get_checkpoint(BACKFILL_CHECKPOINT)
+    assert state == {'head': dm.repo.head.commit.hexsha, 'base': None, 'offset': 5, 'done': False}
+    assert dm.session.query(DecisionModel).count() == 1
+
+    calls = count_classify(dm, monkeypatch)
+    assert dm.backfill_history(chunk_size=5) == 3
+    assert len(calls) == COMMITS - 5
+    assert dm.store.get_checkpoint(BACKFILL_CHECKPOINT)['done'] is True
+    assert dm.session.query(DecisionModel).count() == 4
+
+def test_finished_backfill_only_walks_new_commits(dm, monkeypatch):
+    dm.backfill_history(chunk_size=5)
+
+    calls = count_classify(dm, monkeypatch)
+    assert dm.backfill_history(chunk_size=5) == 0
+    assert calls == []
+
+    make_history(dm.repo, COMMITS, 4)
+    assert dm.backfill_history(chunk_size=5) == 2
+    assert len(calls) == 4
+
+def test_rewritten_checkpoint_head_restarts(dm, monkeypatch):
+    dm.store.bulk_insert([], checkpoint=(BACKFILL_CHECKPOINT, {
+        'head': 'f' * 40, 'base': None, 'offset': 5, 'done': False
+    }))
+
+    calls = count_classify(dm, monkeypatch)
+    assert dm.backfill_history(chunk_size=5) == 4
+    assert len(calls) == COMMITS
+
+def test_force_is_rejected_with_all():
+    result = CliRunner().invoke(cli.cli, ['analyze', '--all', '--force'])
+    assert result.exit_code == 2
+    assert '--force cannot be combined with --all' in result.output
+
+def test_analyze_looks_up_known_commits_once_per_batch(dm, monkeypatch):
+    assert dm.analyze_repository(batch_size=5) == 4
+
+    existing_hashes = dm.store.existing_hashes
+    lookups = []
+    monkeypatch.setattr(dm.store, 'existing_hashes',
+                        lambda hashes, conn=None: lookups.append(conn) or existing_hashes(hashes, conn))
+    calls = count_classify(dm, monkeypatch)
+
+    make_history(dm.repo, COMMITS, 3)
+    assert dm.analyze_repository(batch_size=5) == 1
+    assert lookups.count(None) == 3  # 15 commits in batches of 5, outside the writes
+    assert len(calls) == COMMITS + 3 - 4  # only stored decisions are skipped
@@ -0,0 +1,77 @@
+import multiprocessing
+import time
+from datetime import datetime
+
+from git import Repo
+from sqlalchemy.orm import sessionmaker
+
+from analyzer.decision_detector import Decision
+from devmemory import DevMemory
+from storage.models import Decision as DecisionModel, create_db_engine
+from storage.similarity import SimilarityIndex
+
+READERS = 4
+WRITE_SECONDS = 2.0
+MAX_READ_LATENCY = 1.0
+
+def _reader(db_url, index_path, stop, results):
+    """Run list/search/related style queries until the writer is done"""
+    engine = create_db_engine(db_url)
+    index = SimilarityIndex(index_path)
+    Session = sessionmaker(bind=engine)
+    errors = []
+    latencies = []
+
+    while not stop.is_set():
+        session = Session()
+        start = time.perf_counter()
+        try:
+            session.query(DecisionModel).order_by(DecisionModel.created_at.desc()).limit(20).all()
+            session.query(DecisionModel).filter(DecisionModel.title.contains('cache')).all()
+            index.related(1)
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            session.close()
+        latencies.append(time.perf_counter() - start)
+
+    index.close()
+    engine.dispose()
+    results.put((errors, max(latencies, default=0.0), len(latencies)))
+
+def test_readers_never_see_locked_database(tmp_path):
+    Repo.init(tmp_path)
+    db_url = f"sqlite:///{tmp_path / 'devmemory.db'}"
+    dm = DevMemory(repo_path=str(tmp_path), db_url=db_url)
+    assert dm.index.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    ctx = multiprocessing.get_context('fork')
+    stop = ctx.Event()
+    results = ctx.Queue()
+    readers = [ctx.Process(target=_reader, args=(db_url, dm.index_path, stop, results)) for _ in range(READERS)]
+    for p in readers:
+        p.start()
+
+    saved = 0
+    deadline = time.monotonic() + WRITE_SECONDS
+    while time.monotonic() < deadline:
+        batch = [
+            Decision(type='performance_optimization', confidence=0.7,
+                     title=f'Add cache layer {saved + i}', summary='Add cache layer',
+                     commit_hash=f'{saved + i:040x}', author='Test', date=datetime.now(),
+                     files_changed=['cache.py'], indicators=['keywords: cache'])
+            for i in range(50)
+        ]
+        saved += dm._save_decisions(batch)
+
+    stop.set()
+    reports = [results.get(timeout=30) for _ in readers]
+    for p in readers:
+        p.join(timeout=30)
+    dm.close()
+
+    assert saved > 0
+    for errors, max_latency, reads in reports:
+        assert errors == []
+        assert reads > 0
+        assert max_latency < MAX_READ_LATENCY
@@ -0,0 +1,95 @@
+import time
+from pathlib import Path
+
+import pytest
+from git import Repo
+
+from devmemory import DevMemory
+from hooks import HOOK_BEGIN, hook_block, install_hooks, read_heads, watch_refs
+
+# Per-commit budget for the hook hot path, after startup
+CAPTURE_BUDGET_MS = 50
+
+def commit(repo, path, message):
+    (Path(repo.working_tree_dir) / path).write_text(message)
+    repo.index.add([path])
+    return repo.index.commit(message)
+
+@pytest.fixture
+def dm(tmp_path):
+    repo = Repo.init(tmp_path / 'repo')
+    commit(repo, 'README.md', 'Initial commit')
+    dm = DevMemory(repo_path=repo.working_tree_dir,
+                   db_url=f"sqlite:///{tmp_path / 'devmemory.db'}", quiet=True)
+    yield dm
+    dm.close()
+
+def test_install_hooks_keeps_existing_script(dm):
+    hook = Path(dm.repo.git_dir) / 'hooks' / 'post-commit'
+    hook.parent.mkdir(exist_ok=True)
+    hook.write_text('#!/bin/sh\necho custom\n')
+
+    install_hooks(dm.repo)
+    install_hooks(dm.repo)
+
+    script = hook.read_text()
+    assert script.startswith('#!/bin/sh\necho custom\n')
+    assert script.count(HOOK_BEGIN) == 1
+    assert 'capture HEAD' in script
+    assert 'capture ORIG_HEAD..HEAD' in (hook.parent / 'post-merge').read_text()
+
+def test_hook_block_quotes_paths():
+    block = hook_block('post-commit', python="/opt/my env/python", cli_path="/src/it's/cli.py")
+    assert "'/opt/my env/python' '/src/it'\"'\"'s/cli.py' capture HEAD" in block
+
+def test_capture_single_commit_within_budget(dm):
+    commit(dm.repo, 'requirements.txt', 'Add redis for caching')
+    dm.capture_commits('HEAD')  # warm up connections and the similarity index
+
+    commit(dm.repo, 'auth.py', 'Refactor authentication flow')
+    start = time.perf_counter()
+    assert dm.capture_commits('HEAD') == 1
+    assert (time.perf_counter() - start) * 1000 < CAPTURE_BUDGET_MS
+
+    # Already captured commits are skipped
+    assert dm.capture_commits('HEAD') == 0
+
+def test_watch_captures_ref_updates(dm):
+    heads = read_heads(dm.repo)
+    commit(dm.repo, 'a.py', 'Fix security vulnerability in login')
+    commit(dm.repo, 'b.py', 'Temporary workaround for flaky upload')
+
+    captured = []
+    watch_refs(dm, interval=0, max_polls=1, heads=heads,
+               on_capture=lambda ref, sha, saved: captured.append(saved))
+    assert captured == [2]
+
+def test_watch_captures_whole_new_branch(dm):
+    heads = read_heads(dm.repo)
+    dm.repo.git.checkout('-b', 'feature')
+    commit(dm.repo, 'requirements.txt', 'Add redis for caching')
+    commit(dm.repo, 'a.py', 'Fix security vulnerability in login')
+    commit(dm.repo, 'b.py', 'Temporary workaround for flaky upload')
+
+    captured = []
+    watch_refs(dm, interval=0, max_polls=1, heads=heads,
+               on_capture=lambda ref, sha, saved: captured.append((ref, saved)))
+    assert captured == [('refs/heads/feature', 3)]
+
+def test_watch_retries_failed_capture(dm, monkeypatch):
+    heads = read_heads(dm.repo)
+    commit(dm.repo, 'a.py', 'Fix security vulnerability in login')
+    commit(dm.repo, 'b.py', 'Temporary workaround for flaky upload')
+
+    bulk_insert = dm.store.bulk_insert
+    def fail_once(rows, **kwargs):
+        monkeypatch.setattr(dm.store, 'bulk_insert', bulk_insert)
+        raise RuntimeError('database is locked')
+    monkeypatch.setattr(dm.store, 'bulk_insert', fail_once)
+
+    captured, errors = [], []
+    watch_refs(dm, interval=0, max_polls=2, heads=heads,
+               on_capture=lambda ref, sha, saved: captured.append(saved),
+               on_error=lambda ref, sha, error: errors.append(str(error)))
+    assert errors == ['database is locked']
+    assert captured == [2]
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+from git import Repo
+
+from devmemory import DevMemory
+from storage.models import Decision as DecisionModel
+from storage.similarity import SimilarityIndex
+
+def test_near_duplicates_are_related(tmp_path):
+    index = SimilarityIndex(str(tmp_path / 'test.lsh'))
+    index.add_many([
+        (1, 'Add Redis for caching sessions', 'Add Redis for caching sessions', ['requirements.txt', 'app/cache.py']),
+        (2, 'Add Redis cache for user sessions', 'Add Redis cache for user sessions', ['requirements.txt', 'app/cache.py']),
+        (3, 'Fix XSS vulnerability in login form', 'Fix XSS vulnerability in login form', ['templates/login.html']),
+    ])
+
+    related = index.related(1)
+    assert [r[0] for r in related] == [2]
+    assert related[0][1] > 0.3
+    index.close()
+
+def test_index_persists_and_skips_known_ids(tmp_path):
+    path = str(tmp_path / 'test.lsh')
+    index = SimilarityIndex(path)
+    index.add(7, 'Refactor auth module', 'Refactor auth module', ['auth.py'])
+    index.add(7, 'Something else entirely', '', [])
+    index.close()
+
+    index = SimilarityIndex(path)
+    assert index.max_id() == 7
+    index.add(8, 'Refactor auth module', 'Refactor auth module', ['auth.py'])
+    assert index.related(8) == [(7, 1.0)]
+    assert index.related(99) == []
+    index.close()
+
+def test_index_is_reset_for_a_different_source(tmp_path):
+    path = str(tmp_path / 'test.lsh')
+    index = SimilarityIndex(path, source='postgresql://db-a/devmemory')
+    index.add(5, 'Refactor auth module', 'Refactor auth module', ['auth.py'])
+    index.close()
+
+    index = SimilarityIndex(path, source='postgresql://db-a/devmemory')
+    assert index.max_id() == 5
+    index.close()
+
+    index = SimilarityIndex(path, source='postgresql://db-b/devmemory')
+    assert index.max_id() == 0
+    assert index.source() == 'postgresql://db-b/devmemory'
+    index.close()
+
+def commit_all(repo, changes):
+    for path, message in changes:
+        (Path(repo.working_tree_dir) / path).parent.mkdir(parents=True, exist_ok=True)
+        (Path(repo.working_tree_dir) / path).write_text(message)
+        repo.index.add([path])
+        repo.index.commit(message)
+    return f'HEAD~{len(changes)}..HEAD'
+
+def test_recreated_database_reindexes_from_scratch(tmp_path):
+    repo = Repo.init(tmp_path / 'repo')
+    commit_all(repo, [('README.md', 'Initial commit')])
+    db_url = f"sqlite:///{tmp_path / 'devmemory.db'}"
+
+    dm = DevMemory(repo_path=repo.working_tree_dir, db_url=db_url, quiet=True)
+    dm.capture_commits(commit_all(repo, [
+        ('requirements.txt', 'Add redis for caching sessions'),
+        ('app/cache.py', 'Add redis cache for user sessions'),
+        ('app/profile.py', 'Add redis for caching user profiles'),
+    ]))
+    assert dm.index.max_id() == 3
+    dm.close()
+
+    # Same file name, fresh database: ids restart at 1 and grow past the
+    # old maximum before the index is looked at again
+    (tmp_path / 'devmemory.db').unlink()
+    dm = DevMemory(repo_path=repo.working_tree_dir, db_url=db_url, quiet=True)
+    assert dm.capture_commits(commit_all(repo, [
+        ('templates/login.html', 'Fix XSS vulnerability in login form'),
+        ('templates/login.html', 'Fix another XSS vulnerability in login form'),
+        ('auth.py', 'Refactor authentication flow'),
+        ('upload.py', 'Temporary workaround for flaky upload'),
+    ])) == 4
+    assert dm.index.max_id() == 4
+
+    titles = dict(dm.session.query(DecisionModel.id, DecisionModel.title))
+    login = next(i for i, title in titles.items() if title.startswith('Fix XSS'))
+    assert [titles[r[0]] for r in dm.index.related(login)] == ['Fix another XSS vulnerability in login form']
+    dm.close()
+
+def test_templated_decisions_keep_candidates_bounded(tmp_path):
+    index = SimilarityIndex(str(tmp_path / 'test.lsh'), max_candidates=50)
+    index.add_many(
+        (n, f'Refactor module {n}', f'Refactor module {n}\n\nSplit into smaller pieces', ['src/module.py'])
+        for n in range(1, 2001)
+    )
+
+    # Every row lands in the same buckets; the query still reads a fixed slice
+    assert len(index.candidates(1)) == 50
+    related = index.related(1, limit=5)
+    assert len(related) == 5
+    assert all(score >= index.threshold for _, score in related)
+    index.close()